@@ -14,9 +14,13 @@ import sys
 import os
 import json
 import datetime
-import shutil
+import re
+import stat
 import traceback
-from collections import defaultdict
+import functools
+from collections import Counter, defaultdict
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     from anyascii import anyascii
@@ -29,21 +33,96 @@ except ImportError:
         return s
 
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# orjson turns integers outside [-2**63, 2**64) into floats instead of failing,
+# which would change them when the file is saved again
+_long_number = re.compile(rb"\d{19,}")
+
+
+def _loads(raw: bytes) -> object:
+    if orjson and not _long_number.search(raw):
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # let the stdlib parser report the error (it also accepts NaN etc.)
+            pass
+
+    return json.loads(raw.decode("utf-8"))
+
+
+# same settings json.dump(data, f, indent=4, ensure_ascii=False) would use
+_json_encoder = json.JSONEncoder(indent=4, ensure_ascii=False)
+
+# characters that can't be part of a path argument
+_invalid_arg_chars = "<>|"
+_invalid_arg_chars_table = str.maketrans("", "", _invalid_arg_chars)
+
+
+@functools.lru_cache(maxsize=None)
+def _ascii_decode(name: str) -> str:
+    # the same names are checked over and over across items and passes
+    return anyascii(name)
+
+
+_lower_cache = {}
+
+
+def _lower(name: str) -> str:
+    # class names repeat a lot across passes, so memoize their lowercase form.
+    # Differently cased spellings share one interned string, which keeps the
+    # name dicts small and lets lookups succeed on identity
+    name_lower = _lower_cache.get(name)
+
+    if name_lower is None:
+        name_lower = _lower_cache[name] = sys.intern(name.lower())
+
+    return name_lower
+
+
+def _filter_variants(variants: list[str], variant_lower: str, add: bool) -> list[str]:
+    # removes variant_lower from variants, but keeps its first occurrence if add
+    filtered = []
+
+    for variant in variants:
+        if _lower(variant) == variant_lower:
+            if not add:
+                continue
+
+            add = False
+
+        filtered.append(variant)
+
+    return filtered
+
+
 class Issue(str):
-    critical = False
-    fixed = False
+    __slots__ = ("critical", "fixed")
+
+    def __new__(cls, errormsg: str, critical: bool = False) -> "Issue":
+        issue = super().__new__(cls, errormsg)
+        issue.critical = critical
+        issue.fixed = False
+        return issue
 
 
 class Issues(list[Issue]):
-    fixed_count = 0
+    __slots__ = ("fixed_count",)
+
+    def __init__(self, *args) -> None:
+        super().__init__(*args)
+        self.fixed_count = 0
 
 
 class IssuesDict(defaultdict[Issues]):
     def clear_noncritical(self):
-        for key, issues in self.copy().items():
-            for issue in list(issues):
-                if not issue.critical:
-                    issues.remove(issue)
+        for key in list(self.keys()):
+            issues = self[key]
+            issues[:] = [issue for issue in issues if issue.critical]
 
             if not issues:
                 self.pop(key)
@@ -60,12 +139,17 @@ class App:
         self.files_count = 0
         self.modified_files = {}
         self.all_parents = {}
-        self.all_variants = defaultdict(list[str])
+        self.all_variants = {}
+        self.all_names_lower = set()
         self.issues = IssuesDict(Issues)
+        self.last_issue = None
         self.issues_count = 0
         self.fixed_count = 0
         self.item_name_to_file_path = {}
         self.item_name_to_data = {}
+        self.file_path_to_category = {}
+        self.attachment_variant_names = {}
+        self.reported_own_variants = set()
         self.exitcode = 0
 
     def load_items(self, folder_path: str) -> bool:
@@ -81,30 +165,84 @@ class App:
 
         folder_files_count = 0
 
-        for root, dirs, files in os.walk(folder_path):
-            for filename in files:
-                if filename.lower().endswith(".json"):
-                    file_path = os.path.join(root, filename)
-                    file_path_rel = os.path.relpath(file_path, folder_path)
+        file_paths = list(self._iter_json(folder_path))
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
 
-                    try:
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            data = json.load(f)
+        # read and parse files concurrently, but collect results in walk order
+        # so that duplicate resolution and issue order stay deterministic
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(self._load_json, file_paths))
 
-                    except Exception as e:
-                        print(f"Error processing file {file_path}: {e}")
-                        continue
+        # walked paths all start with the folder path, so the relative path is
+        # just the rest (same as os.path.relpath, without normalizing both)
+        prefix_len = len(os.path.join(folder_path, ""))
 
-                    self.folders[folder_path][file_path_rel] = data
-                    category, ext = os.path.splitext(file_path_rel)
-                    self.categories[folder_path][category.lower()] = data
-                    self.files_count += 1
-                    folder_files_count += 1
+        for file_path, (data, error) in zip(file_paths, results):
+            if error is not None:
+                print(f"Error processing file {file_path}: {error}")
+                continue
+
+            file_path_rel = file_path[prefix_len:]
+            self.folders[folder_path][file_path_rel] = data
+            category, category_lower = self._get_category(file_path_rel)
+            self.categories[folder_path][category_lower] = data
+            folder_files_count += 1
+
+        self.files_count += folder_files_count
 
         print(f"Found {folder_files_count} files")
 
         return True
 
+    def _load_json(self, file_path: str) -> tuple[object, Exception | None]:
+        try:
+            with open(file_path, "rb") as f:
+                return (_loads(f.read()), None)
+
+        except Exception as e:
+            return (None, e)
+
+    def _get_category(self, file_path_rel: str) -> tuple[str, str]:
+        category = self.file_path_to_category.get(file_path_rel)
+
+        if category is None:
+            name, ext = os.path.splitext(file_path_rel)
+            category = (name, name.lower())
+            self.file_path_to_category[file_path_rel] = category
+
+        return category
+
+    def _iter_json(self, path: str) -> Iterator[str]:
+        # same top-down order as os.walk (files first, then subfolders), but
+        # uses the file type cached in each DirEntry instead of extra stat calls.
+        # Entries are sorted the way NTFS lists them so that the order (and thus
+        # which of two duplicates is kept) doesn't depend on the filesystem
+        subfolders = []
+
+        try:
+            with os.scandir(path) as it:
+                # names are unique within a folder, so entries never get compared
+                entries = sorted(
+                    (entry.name.upper(), entry.name, entry) for entry in it
+                )
+        except OSError:
+            return
+
+        for name_upper, _, entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if is_dir:
+                if not entry.is_symlink():
+                    subfolders.append(entry.path)
+            elif name_upper.endswith(".JSON"):
+                yield entry.path
+
+        for subfolder in subfolders:
+            yield from self._iter_json(subfolder)
+
     def process_items(self, options: dict) -> tuple[defaultdict[Issues], int]:
         self.options = options
         self.all_parents.clear()
@@ -114,6 +252,8 @@ class App:
         self.fixed_count = 0
         self.item_name_to_file_path.clear()
         self.item_name_to_data.clear()
+        self.attachment_variant_names.clear()
+        self.reported_own_variants.clear()
 
         try:
             self._process_items()
@@ -130,59 +270,40 @@ class App:
         issues = defaultdict(Issues)
 
         for key, values in self.issues.items():
-            for issue in values:
-                issues[key].append(issue)
+            issues[key] = Issues(values)
 
         return (issues, self.issues_count)
 
     def _process_items(self) -> None:
-        # 1) populate global arrays
-        for folder_path, categories in self.folders.items():
-            for file_path_rel, data in categories.items():
-                if type(data) is not dict:
-                    self._add_issue(
-                        folder_path,
-                        file_path_rel,
-                        f"[E] CRITICAL: Data in '{file_path_rel}' is not a JSON object. Removing.",
-                        critical=True,
-                    )
-                    self._fix(folder_path, file_path_rel, data)
-                    data.clear()
-                    continue
+        all_parents = self.all_parents
+        all_variants = self.all_variants
+        item_name_to_file_path = self.item_name_to_file_path
+        item_name_to_data = self.item_name_to_data
 
-                trader_categories = data.get("Categories")
+        # files of each folder in processing order, along with the validated
+        # items of market files (None for trader files and files without items)
+        folder_files = []
 
-                if trader_categories is not None:
-                    continue
+        # 1) populate global arrays
+        for folder_path, categories in self.folders.items():
+            files = []
+            folder_files.append((folder_path, categories, files))
 
-                items = data.get("Items", [])
+            for file_path_rel, data in categories.items():
+                items = self._validate_container(folder_path, file_path_rel, data)
+                files.append((file_path_rel, data, items))
 
-                if type(items) is not list:
-                    self._add_issue(
-                        folder_path,
-                        file_path_rel,
-                        f"[E] CRITICAL: Items in '{file_path_rel}' is not a JSON list. Removing.",
-                        critical=True,
-                    )
-                    self._fix(folder_path, file_path_rel, data)
-                    data["Items"] = []
+                if items is None:
                     continue
 
-                if len(items) > 0:
-                    item = items[0]
+                # items to keep, rebuilt in a single pass instead of removing
+                # from the list while iterating it
+                kept = []
 
-                    if type(item) is list and len(item) > 0 and type(item[0]) is dict:
-                        self._add_issue(
-                            folder_path,
-                            file_path_rel,
-                            f"[E] CRITICAL: Items in '{file_path_rel}' are improperly nested.",
-                        )
-                        self._fix(folder_path, file_path_rel, data)
-                        items = item
-                        data["Items"] = items
-
-                for i, item in enumerate(list(items)):
-                    if type(item) is not dict:
+                for i, item in enumerate(items):
+                    try:
+                        parent = item.get("ClassName", "")
+                    except AttributeError:
                         self._add_issue(
                             folder_path,
                             file_path_rel,
@@ -190,19 +311,16 @@ class App:
                             critical=True,
                         )
                         self._fix(folder_path, file_path_rel, data)
-                        items.remove(item)
                         continue
 
-                    parent = item.get("ClassName", "")
-
-                    if not parent.strip():
+                    if not parent or parent.isspace():
                         self._add_issue(
                             folder_path,
                             file_path_rel,
                             f"[E] Item with empty ClassName in '{file_path_rel}'",
                         )
-                        if self._confirm_fix(folder_path, file_path_rel, data):
-                            items.remove(item)
+                        if not self._confirm_fix(folder_path, file_path_rel, data):
+                            kept.append(item)
                         continue
 
                     decoded = self._fix_invalid_classname(
@@ -213,7 +331,7 @@ class App:
                         parent = decoded
                         item["ClassName"] = parent
 
-                    parent_lower = parent.lower()
+                    parent_lower = _lower(parent)
 
                     variants_orig = item.get("Variants", [])
 
@@ -226,6 +344,7 @@ class App:
                         )
                         self._fix(folder_path, file_path_rel, data)
                         variants_orig.clear()
+                        kept.append(item)
                         continue
 
                     atts_orig = item.get("SpawnAttachments", [])
@@ -239,27 +358,33 @@ class App:
                         )
                         self._fix(folder_path, file_path_rel, data)
                         atts_orig.clear()
+                        kept.append(item)
                         continue
 
-                    existing = self.all_parents.get(parent_lower)
+                    existing = all_parents.get(parent_lower)
 
                     if existing:
-                        if len(existing.get("Variants", [])) < len(
+                        if len(existing.get("Variants", ())) < len(
                             variants_orig
-                        ) or len(existing.get("SpawnAttachments", [])) < len(atts_orig):
+                        ) or len(existing.get("SpawnAttachments", ())) < len(atts_orig):
                             # if the existing item has less variants or attachments, remove it
-                            duplicate_data = self.item_name_to_data[parent_lower]
+                            duplicate_data = item_name_to_data[parent_lower]
                             duplicate_items = duplicate_data.get("Items", [])
-                            duplicate_file_path_rel = self.item_name_to_file_path[
+                            duplicate_file_path_rel = item_name_to_file_path[
                                 parent_lower
                             ]
                             duplicate_item = existing
                         else:
                             duplicate_data = data
-                            duplicate_items = items
                             duplicate_file_path_rel = file_path_rel
                             duplicate_item = item
 
+                        if duplicate_data is data:
+                            # items of this file are being rebuilt
+                            duplicate_items = kept
+
+                        kept.append(item)
+
                         self._add_issue(
                             folder_path,
                             duplicate_file_path_rel,
@@ -276,14 +401,16 @@ class App:
 
                         continue
 
-                    self.all_parents[parent_lower] = item
-                    self.item_name_to_file_path[parent_lower] = file_path_rel
-                    self.item_name_to_data[parent_lower] = data
+                    kept.append(item)
+
+                    all_parents[parent_lower] = item
+                    item_name_to_file_path[parent_lower] = file_path_rel
+                    item_name_to_data[parent_lower] = data
 
                     variants = []
 
                     for variant in variants_orig:
-                        if not variant.strip():
+                        if not variant or variant.isspace():
                             self._add_issue(
                                 folder_path,
                                 file_path_rel,
@@ -301,45 +428,72 @@ class App:
 
                         variants.append(variant)
 
-                        variant_lower = variant.lower()
-                        self.all_variants[variant_lower].append(parent_lower)
+                        variant_lower = _lower(variant)
+                        parents = all_variants.get(variant_lower)
+
+                        if parents is None:
+                            all_variants[variant_lower] = [parent_lower]
+                        else:
+                            parents.append(parent_lower)
 
                     if variants != variants_orig:
                         item["Variants"] = variants
 
+                if len(kept) < len(items):
+                    items[:] = kept
+
+        # names of all items and variants known to the market
+        all_names_lower = self.all_names_lower
+        all_names_lower.clear()
+        all_names_lower.update(all_parents)
+        all_names_lower.update(all_variants)
+
         # 2) process
-        for folder_path, categories in self.folders.items():
+        for folder_path, categories, files in folder_files:
             attachments_to_add = {}
 
-            for file_path_rel, data in categories.items():
-                trader_categories = data.get("Categories")
+            for file_path_rel, data, items in files:
+                if items is None:
+                    trader_categories = data.get("Categories")
+
+                    if trader_categories is not None:
+                        self._process_trader_categories(
+                            data,
+                            trader_categories,
+                            data.get("Items", {}),
+                            folder_path,
+                            file_path_rel,
+                        )
 
-                if trader_categories is not None:
-                    self._process_trader_categories(
-                        data,
-                        trader_categories,
-                        data.get("Items", {}),
-                        folder_path,
-                        file_path_rel,
-                    )
                     continue
 
-                items = data.get("Items", [])
+                # fixes below can change variants and attachments
+                self.attachment_variant_names.clear()
 
+                # not a snapshot: fixes below can still move items between
+                # files and rewrite variant lists of items not processed yet
                 for item in items:
                     parent = item.get("ClassName", "")
-                    parent_lower = parent.lower()
-                    variants = item.get("Variants", [])
+                    parent_lower = _lower(parent)
+                    variants = item.get("Variants", ())
 
                     # self._process_item_parents(data, parent_lower, folder_path, file_path_rel)
 
                     for variant in variants:
-                        variant_lower = variant.lower()
+                        variant_lower = _lower(variant)
+                        parents = all_variants.get(variant_lower)
+
+                        if parents is None:
+                            # variants of items that weren't registered in pass 1
+                            # (replaced duplicates) are known from here on
+                            parents = all_variants[variant_lower] = []
+                            all_names_lower.add(variant_lower)
+
                         self._process_variant(
                             data,
                             item,
                             variant_lower,
-                            self.all_variants[variant_lower],
+                            parents,
                             folder_path,
                             file_path_rel,
                         )
@@ -349,7 +503,7 @@ class App:
                     atts = []
 
                     for attachment_name in atts_orig:
-                        if not attachment_name.strip():
+                        if not attachment_name or attachment_name.isspace():
                             self._add_issue(
                                 folder_path,
                                 file_path_rel,
@@ -367,11 +521,10 @@ class App:
 
                         atts.append(attachment_name)
 
-                        attachment_name_lower = attachment_name.lower()
+                        attachment_name_lower = _lower(attachment_name)
 
                         if (
-                            attachment_name_lower not in self.all_parents
-                            and attachment_name_lower not in self.all_variants
+                            attachment_name_lower not in all_names_lower
                             and attachment_name_lower not in attachments_to_add
                         ):
                             self._add_issue(
@@ -416,11 +569,24 @@ class App:
                     if attachment:
                         items.append(attachment)
 
+                # list the folder once instead of probing file names one by one
+                # (lowercased, as file names are case-insensitive on Windows),
+                # and skip names taken by files not saved yet
+                file_names_lower = {name.lower() for name in categories}
+
+                try:
+                    file_names_lower.update(
+                        name.lower() for name in os.listdir(folder_path)
+                    )
+
+                except OSError:
+                    pass
+
                 num = 1
                 while True:
                     file_path_rel = f"Missing_Attachments_{num}.json"
-                    file_path = os.path.join(folder_path, file_path_rel)
-                    if not os.path.exists(file_path):
+                    if file_path_rel.lower() not in file_names_lower:
+                        file_path = os.path.join(folder_path, file_path_rel)
                         categories[file_path_rel] = data
                         self.modified_files[file_path] = data
                         break
@@ -429,10 +595,58 @@ class App:
         if self.issues_count > 0:
             print("")
 
+    def _validate_container(
+        self, folder_path: str, file_path_rel: str, data: dict
+    ) -> list | None:
+        # returns the market items of a file, or None if there are none to process
+        if type(data) is not dict:
+            self._add_issue(
+                folder_path,
+                file_path_rel,
+                f"[E] CRITICAL: Data in '{file_path_rel}' is not a JSON object. Removing.",
+                critical=True,
+            )
+            self._fix(folder_path, file_path_rel, data)
+            data.clear()
+            return None
+
+        trader_categories = data.get("Categories")
+
+        if trader_categories is not None:
+            return None
+
+        items = data.get("Items", [])
+
+        if type(items) is not list:
+            self._add_issue(
+                folder_path,
+                file_path_rel,
+                f"[E] CRITICAL: Items in '{file_path_rel}' is not a JSON list. Removing.",
+                critical=True,
+            )
+            self._fix(folder_path, file_path_rel, data)
+            data["Items"] = []
+            return None
+
+        if len(items) > 0:
+            item = items[0]
+
+            if type(item) is list and len(item) > 0 and type(item[0]) is dict:
+                self._add_issue(
+                    folder_path,
+                    file_path_rel,
+                    f"[E] CRITICAL: Items in '{file_path_rel}' are improperly nested.",
+                )
+                self._fix(folder_path, file_path_rel, data)
+                items = item
+                data["Items"] = items
+
+        return items
+
     def _fix_invalid_classname(
         self, data: dict, name: str, folder_path: str, file_path_rel: str
     ) -> str:
-        decoded = anyascii(name)
+        decoded = _ascii_decode(name)
 
         sanitized_name = ""
 
@@ -494,30 +708,37 @@ class App:
         folder_path: str,
         file_path_rel: str,
     ) -> None:
-        same_parent_counts = {}
+        if variant_lower in parents:
+            self._add_issue(
+                folder_path,
+                file_path_rel,
+                f"[W] '{variant_lower}' lists itself as a variant",
+            )
+            parents[:] = [
+                parent_lower
+                for parent_lower in parents
+                if parent_lower != variant_lower
+            ]  # don't repeat the error for the same variant
 
-        for parent_lower in parents:
-            if variant_lower == parent_lower:
-                self._add_issue(
-                    folder_path,
-                    file_path_rel,
-                    f"[W] '{variant_lower}' lists itself as a variant",
-                )
-                parents.remove(
-                    parent_lower
-                )  # don't repeat the error for the same variant
+            if self._confirm_fix(folder_path, file_path_rel, data):
+                self._update_variants(variant_lower, item)
 
-                if self._confirm_fix(folder_path, file_path_rel, data):
-                    self._update_variants(variant_lower, item)
-            else:
-                same_parent_count = same_parent_counts.get(parent_lower, 0)
-                same_parent_counts[parent_lower] = same_parent_count + 1
+        same_parent_counts = Counter(parents)
 
-        variants = self.all_parents.get(variant_lower, {}).get("Variants", [])
+        variant_item = self.all_parents.get(variant_lower)
+        variants = variant_item.get("Variants", ()) if variant_item else ()
 
         if variants:
+            # parents are still needed by the checks below, so remember which
+            # (variant, parent) pairs were reported instead of trimming them
+            reported_own_variants = self.reported_own_variants
+
             for parent_lower in parents:
-                if parent_lower != variant_lower:
+                if (
+                    parent_lower != variant_lower
+                    and (variant_lower, parent_lower) not in reported_own_variants
+                ):
+                    reported_own_variants.add((variant_lower, parent_lower))
                     self._add_issue(
                         folder_path,
                         file_path_rel,
@@ -538,17 +759,16 @@ class App:
                         f"[E] '{parent_lower}' lists variant '{variant_lower}' {same_parent_count} times",
                     )
 
-                    while same_parent_count > 1:
-                        parents.remove(
-                            parent_lower
-                        )  # don't repeat the error for the same variant
-                        same_parent_count -= 1
-
                     if self._confirm_fix(folder_path, file_path_rel, data):
                         self._update_variants(
                             variant_lower, self.all_parents[parent_lower], True
                         )
 
+            if len(same_parent_counts) < len(parents):
+                # keep only the last occurrence of each parent
+                # (don't repeat the error for the same variant)
+                parents[:] = list(dict.fromkeys(reversed(parents)))[::-1]
+
             if len(parents) > 1:
                 self._add_issue(
                     folder_path,
@@ -590,7 +810,10 @@ class App:
         folder_path: str,
         file_path_rel: str,
     ) -> None:
+        # list keeps the order categories are checked in (and picks up ones
+        # added while checking), set is for fast membership tests
         category_names_lower = []
+        category_names_lower_set = set()
 
         for trader_category in trader_categories:
             if ":" in trader_category:
@@ -598,18 +821,17 @@ class App:
             else:
                 category_name, buy_sell = trader_category, 1
 
-            category_names_lower.append(category_name.lower())
+            category_name_lower = _lower(category_name)
+            category_names_lower.append(category_name_lower)
+            category_names_lower_set.add(category_name_lower)
 
         trader_items_copy = trader_items.copy()
-        item_names_lower = []
+        item_names_lower = set()
 
         for trader_item_name, buy_sell in trader_items_copy.items():
-            item_name_lower = trader_item_name.lower()
+            item_name_lower = _lower(trader_item_name)
 
-            if (
-                item_name_lower not in self.all_parents
-                and item_name_lower not in self.all_variants
-            ):
+            if item_name_lower not in self.all_names_lower:
                 self._add_issue(
                     folder_path,
                     file_path_rel,
@@ -620,7 +842,11 @@ class App:
                     trader_items.pop(trader_item_name)
                     continue
 
-            item_names_lower.append(trader_item_name.lower())
+            item_names_lower.add(item_name_lower)
+
+        # variant names reachable through attachments that were already
+        # checked for this trader (checking them again can't add anything)
+        checked_names_lower = set()
 
         for category_name_lower in category_names_lower:
             for category_folder_path, categories in self.categories.items():
@@ -629,133 +855,140 @@ class App:
                 if category_data.get("Categories"):
                     continue
 
-                items = category_data.get("Items", [])
+                items = category_data.get("Items", ())
 
                 for item in items:
-                    self._check_add_trader_categories(
-                        item,
-                        1,
-                        False,
-                        False,
-                        0,
-                        category_names_lower,
-                        item_names_lower,
-                        data,
-                        trader_categories,
-                        trader_items,
-                        folder_path,
-                        file_path_rel,
-                    )
+                    for attachment_name in item.get("SpawnAttachments", ()):
+                        attachment_names_lower = self._get_attachment_variant_names(
+                            _lower(attachment_name)
+                        )
 
-    def _check_add_trader_categories(
-        self,
-        item: dict,
-        buy_sell: int,
-        is_variant: bool,
-        is_attachment: bool,
-        level: int,
-        category_names_lower: list[str],
-        item_names_lower: list[str],
-        data: dict,
-        trader_categories: list[str],
-        trader_items: dict,
-        folder_path: str,
-        file_path_rel: str,
-    ) -> None:
-        variants = item.get("Variants", [])
-
-        for variant_name in variants:
-            self._check_add_trader_category(
-                variant_name,
-                buy_sell,
-                True,
-                is_attachment,
-                level,
-                category_names_lower,
-                item_names_lower,
-                data,
-                trader_categories,
-                trader_items,
-                folder_path,
-                file_path_rel,
-            )
+                        for item_name_lower in attachment_names_lower:
+                            if item_name_lower in checked_names_lower:
+                                continue
 
-        atts = item.get("SpawnAttachments", [])
-
-        for attachment_name in atts:
-            attachment_name_lower = attachment_name.lower()
-            is_variant = attachment_name_lower in self.all_variants
-            self._check_add_trader_category(
-                attachment_name,
-                3,
-                is_variant,
-                True,
-                level + 1,
-                category_names_lower,
-                item_names_lower,
-                data,
-                trader_categories,
-                trader_items,
-                folder_path,
-                file_path_rel,
-            )
-            att = self.all_parents.get(attachment_name_lower)
-            if att:
-                self._check_add_trader_categories(
-                    att,
-                    3,
-                    is_variant,
-                    True,
-                    level + 1,
-                    category_names_lower,
-                    item_names_lower,
-                    data,
-                    trader_categories,
-                    trader_items,
-                    folder_path,
-                    file_path_rel,
+                            checked_names_lower.add(item_name_lower)
+
+                            self._check_add_trader_category(
+                                item_name_lower,
+                                3,
+                                category_names_lower,
+                                category_names_lower_set,
+                                item_names_lower,
+                                data,
+                                trader_categories,
+                                trader_items,
+                                folder_path,
+                                file_path_rel,
+                            )
+
+    def _get_attachment_variant_names(
+        self, attachment_name_lower: str
+    ) -> tuple[str, ...]:
+        # names of variants reachable from an attachment: the attachment
+        # itself if it is a variant, plus the variants of the attachment item
+        # and (recursively) of its own attachments, in depth-first order
+        names_lower = self.attachment_variant_names.get(attachment_name_lower)
+
+        if names_lower is None:
+            names_lower = self._collect_attachment_variant_names(
+                attachment_name_lower, {}, []
+            )[0]
+
+        return names_lower
+
+    def _collect_attachment_variant_names(
+        self, attachment_name_lower: str, depths: dict[str, int], stack: list[str]
+    ) -> tuple[tuple[str, ...], int | None]:
+        # depth-first search that treats attachments which (indirectly) attach
+        # themselves like Tarjan's algorithm does: all attachments on such a
+        # cycle reach the same variants, so nothing on it is cached until the
+        # first of them that was visited is done. Returns the names found and,
+        # if they are still incomplete, the depth of the earliest unfinished
+        # attachment that was reached
+        names_lower = self.attachment_variant_names.get(attachment_name_lower)
+
+        if names_lower is not None:
+            return (names_lower, None)
+
+        depth = depths.get(attachment_name_lower)
+
+        if depth is not None:
+            return ((), depth)  # still being collected further up
+
+        depth = depths[attachment_name_lower] = len(depths)
+        lowest_depth = depth
+        stack.append(attachment_name_lower)
+
+        names_lower = {}
+
+        if attachment_name_lower in self.all_variants:
+            names_lower[attachment_name_lower] = None
+
+        att = self.all_parents.get(attachment_name_lower)
+
+        if att:
+            for variant_name in att.get("Variants", ()):
+                names_lower[_lower(variant_name)] = None
+
+            for attachment_name in att.get("SpawnAttachments", ()):
+                att_names_lower, att_depth = self._collect_attachment_variant_names(
+                    _lower(attachment_name), depths, stack
                 )
 
+                for name_lower in att_names_lower:
+                    names_lower[name_lower] = None
+
+                if att_depth is not None and att_depth < lowest_depth:
+                    lowest_depth = att_depth
+
+        names_lower = tuple(names_lower)
+
+        if lowest_depth < depth:
+            return (names_lower, lowest_depth)
+
+        # everything visited since this attachment that is still unfinished
+        # is on a cycle with it and reaches the same variants
+        while True:
+            name_lower = stack.pop()
+            self.attachment_variant_names[name_lower] = names_lower
+
+            if name_lower == attachment_name_lower:
+                break
+
+        return (names_lower, None)
+
     def _check_add_trader_category(
         self,
-        item_name: str,
+        item_name_lower: str,
         buy_sell: int,
-        is_variant: bool,
-        is_attachment: bool,
-        level: int,
         category_names_lower: list[str],
-        item_names_lower: list[str],
+        category_names_lower_set: set[str],
+        item_names_lower: set[str],
         data: dict,
         trader_categories: list[str],
         trader_items: dict,
         folder_path: str,
         file_path_rel: str,
     ) -> None:
-        if not is_variant or not is_attachment:
-            return
-
-        item_name_lower = item_name.lower()
-
-        parents = self.all_variants[item_name_lower]
+        parents = self.all_variants.get(item_name_lower, ())
 
         for parent_lower in parents:
             if parent_lower in item_names_lower:
                 return
 
             data_file_path_rel = self.item_name_to_file_path[parent_lower]
-            category, ext = os.path.splitext(data_file_path_rel)
+            category, category_lower = self._get_category(data_file_path_rel)
 
-            category_lower = category.lower()
-
-            if category_lower not in category_names_lower:
+            if category_lower not in category_names_lower_set:
                 self._add_issue(
                     folder_path,
                     file_path_rel,
                     f"[E] Category '{category}' is missing from trader '{file_path_rel}'",
                 )
-                category_names_lower.append(
-                    category_lower
-                )  # don't repeat the error for the same category
+                # don't repeat the error for the same category
+                category_names_lower.append(category_lower)
+                category_names_lower_set.add(category_lower)
 
                 if self._confirm_fix(folder_path, file_path_rel, data):
                     trader_categories.append(f"{category}:{buy_sell}")
@@ -774,16 +1007,16 @@ class App:
         errormsg: str,
         critical: bool = False,
     ) -> None:
-        issue = Issue(errormsg)
-        issue.critical = critical
+        issue = Issue(errormsg, critical)
         self.issues[(folder_path, file_path_rel)].append(issue)
+        self.last_issue = issue
         self.issues_count += 1
 
     def _confirm_fix(self, folder_path: str, file_path_rel: str, data: dict) -> bool:
         if self.options["--dry-run"]:
             return False
 
-        issue = list(self.issues.values())[-1][-1]
+        issue = self.last_issue
 
         if not self.options["--noninteractive"]:
             print(issue)
@@ -813,18 +1046,23 @@ class App:
     def _update_variants(
         self, variant_lower: str, parent: dict, add: bool = False
     ) -> None:
-        variants = []
+        variants = parent.get("Variants", ())
+        filtered = _filter_variants(variants, variant_lower, add)
 
-        for i, variant in enumerate(parent.get("Variants", [])):
-            if variant.lower() != variant_lower or add:
-                variants.append(variant)
-                add = False
-
-        parent["Variants"] = variants
+        if len(filtered) != len(variants):
+            parent["Variants"] = filtered
 
     def save_changes(self) -> None:
         for file_path, data in self.modified_files.items():
+            replace = False
+
             if os.path.exists(file_path):
+                st = os.lstat(file_path)
+                # a plain file nothing else links to can be swapped for a new one
+                # (keeping the old inode as the backup), symlinks and hardlinked
+                # files have to be copied and written in place like before
+                replace = stat.S_ISREG(st.st_mode) and st.st_nlink == 1
+
                 timestamp = datetime.datetime.fromtimestamp(
                     os.path.getmtime(file_path)
                 ).strftime("%Y-%m-%dT%H-%M-%S")
@@ -832,7 +1070,10 @@ class App:
 
                 print(f"Creating backup {backup}")
 
-                if not shutil.copyfile(file_path, backup):
+                try:
+                    self._create_backup(file_path, backup, replace)
+
+                except OSError:
                     print(
                         "ERROR: Couldn't create backup file - not overwriting existing file"
                     )
@@ -840,36 +1081,74 @@ class App:
 
             print(f"Saving {file_path}")
 
+            if replace:
+                tmp_file_path = f"{file_path}.tmp"
+            else:
+                tmp_file_path = None
+
             try:
-                with open(file_path, "w", encoding="utf-8") as f:
-                    json.dump(data, f, indent=4, ensure_ascii=False)
+                with open(tmp_file_path or file_path, "w", encoding="utf-8") as f:
+                    # one write of the whole document is cheaper than writing
+                    # the many small chunks the encoder produces
+                    f.write(_json_encoder.encode(data))
                 # print(json.dumps(data, indent=4))
 
+                if tmp_file_path:
+                    # replace rather than overwrite the original, so a hardlinked
+                    # backup keeps the old contents (and a failed write loses
+                    # nothing), with the same permissions the original had
+                    os.chmod(tmp_file_path, stat.S_IMODE(st.st_mode))
+                    os.replace(tmp_file_path, file_path)
+
             except Exception as e:
                 print(f"Error processing file {file_path}: {e}")
+
+                if tmp_file_path and os.path.exists(tmp_file_path):
+                    os.remove(tmp_file_path)
+
                 continue
 
         if self.modified_files:
             print("")
 
+    def _create_backup(self, file_path: str, backup: str, link: bool) -> None:
+        if link:
+            try:
+                # a hardlink needs no copying, see save_changes
+                os.link(file_path, backup)
+                return
+
+            except OSError:
+                pass
+
+        # only needed when a backup can't be linked, so keep it off startup
+        import shutil
+
+        shutil.copyfile(file_path, backup)
+
     def dump_details(self) -> None:
         if self.issues:
+            lines = []
+
             for (folder_path, file_path_rel), issues in self.issues.items():
                 if issues.fixed_count > 0:
-                    print(
+                    lines.append(
                         f"! Fixed {issues.fixed_count}/{len(issues)} issue(s) in file: {os.path.basename(folder_path)}/{file_path_rel}"
                     )
                 else:
-                    print(
+                    lines.append(
                         f"! Found {len(issues)} issue(s) in file: {os.path.basename(folder_path)}/{file_path_rel}"
                     )
 
                 if issues.fixed_count < len(issues):
                     for issue in issues:
                         if not issue.fixed:
-                            print("-", issue)
+                            lines.append(f"- {issue}")
 
-                print("")
+                lines.append("")
+
+            # one write instead of one per line, which is slow on a console
+            print("\n".join(lines))
 
     def dump_summary(self) -> None:
         if self.fixed_count > 0:
@@ -914,18 +1193,17 @@ class App:
             else:
                 arg = arg.strip('"')
 
-                for c in "<>|":
-                    if c in arg:
-                        print(f"[E] Invalid character {c} in argument {i + 1}:")
-                        print(f"    {arg}")
-                        print("   ", "-" * arg.index(c) + "^")
-                        invalid_arg = arg
-                        break
+                # a single pass over the argument in the common (valid) case
+                if arg.translate(_invalid_arg_chars_table) != arg:
+                    c = next(c for c in _invalid_arg_chars if c in arg)
+                    print(f"[E] Invalid character {c} in argument {i + 1}:")
+                    print(f"    {arg}")
+                    print("   ", "-" * arg.index(c) + "^")
+                    invalid_arg = arg
+                elif os.path.isdir(arg):
+                    folder_paths.append(arg)
                 else:
-                    if os.path.isdir(arg):
-                        folder_paths.append(arg)
-                    else:
-                        print(f"Unknown option {arg}")
+                    print(f"Unknown option {arg}")
 
         if not folder_paths and not invalid_arg:
             cwd = os.getcwd()
@@ -992,8 +1270,12 @@ class App:
 
         print(f"Total {self.files_count} files")
 
+        # options for the preview and any additional passes
+        tmp = options.copy()
+
         if not options["--noninteractive"] and not options["--dry-run"]:
-            tmp = options.copy()
+            # only needed to ask for confirmation, noninteractive runs go
+            # straight to a single real pass below
             tmp["--dry-run"] = True
 
             issues, issues_count = self.process_items(tmp)